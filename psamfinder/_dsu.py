@@ -0,0 +1,59 @@
+from functools import lru_cache
+
+import numpy as np
+
+# below this many pairs the plain-Python loop finishes before numba could even be imported
+NUMBA_MIN_PAIRS = 100_000
+
+
+def _union_pairs(parent, rank, pairs_i, pairs_j):
+    """Union every (pairs_i[k], pairs_j[k]) in place, then point each item at its root"""
+    # find is inlined so the same body runs as plain Python and as a numba kernel
+    for k in range(len(pairs_i)):
+        a = pairs_i[k]
+        # path halving: point every other node on the way up at its grandparent
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        b = pairs_j[k]
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if a == b:
+            continue
+        # union by rank keeps the trees shallow
+        if rank[a] < rank[b]:
+            a, b = b, a
+        parent[b] = a
+        if rank[a] == rank[b]:
+            rank[a] += 1
+    for i in range(len(parent)):
+        root = i
+        while parent[root] != root:
+            parent[root] = parent[parent[root]]
+            root = parent[root]
+        parent[i] = root
+
+
+@lru_cache(maxsize=None)
+def _compiled_union_pairs():
+    """_union_pairs compiled with numba, or None when numba isn't installed"""
+    try:
+        from numba import njit # optional: pip install psamfinder[numba]
+    except ImportError:
+        return None
+    return njit(cache=True)(_union_pairs)
+
+
+def dsu_union_pairs(n, pairs_i, pairs_j):
+    """Union every (pairs_i[k], pairs_j[k]) over n items and return each item's root"""
+    if len(pairs_i) > NUMBA_MIN_PAIRS:
+        kernel = _compiled_union_pairs()
+        if kernel is not None:
+            parent = np.arange(n)
+            kernel(parent, np.zeros(n, np.uint8), pairs_i, pairs_j)
+            return parent
+    # lists index far faster than numpy arrays from plain Python
+    parent = list(range(n))
+    _union_pairs(parent, [0] * n, pairs_i.tolist(), pairs_j.tolist())
+    return np.array(parent, dtype=np.int64)
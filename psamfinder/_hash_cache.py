@@ -0,0 +1,109 @@
+import os
+import sqlite3
+import sys
+from typing import List, Optional, Tuple
+
+from platformdirs import user_cache_dir
+
+# bump whenever the files table changes shape, so rows in the old layout are dropped
+HASH_CACHE_VERSION = 3
+
+
+def default_cache_dir() -> str:
+    """Per-user cache directory for psamfinder"""
+    return user_cache_dir("psamfinder")
+
+
+def _file_key(entry: os.DirEntry) -> Optional[Tuple[str, int, int, int, int, int]]:
+    """(absolute path, dev, inode, size, mtime_ns, ctime_ns) for entry, or None if it can't be stat'ed"""
+    try:
+        st = entry.stat(follow_symlinks=False)
+        # DirEntry.stat() leaves st_ino at 0 on Windows; inode() fetches the real file index
+        return (
+            os.path.abspath(entry.path), st.st_dev, entry.inode(),
+            st.st_size, st.st_mtime_ns, st.st_ctime_ns
+        )
+    except OSError:
+        return None
+
+
+class HashCache:
+    """File digests persisted in sqlite, keyed by (absolute path, algo) and validated by stat fields"""
+
+    def __init__(self, enabled: bool = True, db_path: Optional[str] = None) -> None:
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: List[Tuple[str, str, int, int, int, int, int, str]] = []
+        if not enabled:
+            return
+        try:
+            if db_path is None:
+                db_path = os.path.join(default_cache_dir(), "hashes.sqlite3")
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            # lookups happen on the scanning thread only; inserts are batched in flush()
+            self._conn = sqlite3.connect(db_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != HASH_CACHE_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS files")
+                self._conn.execute(f"PRAGMA user_version = {HASH_CACHE_VERSION}")
+            # keyed on the path: st_dev/st_ino are 0 on Windows and unstable on FAT/exFAT,
+            # so they only serve as extra checks that the file is still the same one
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT, algo TEXT, dev INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER, "
+                "ctime_ns INTEGER, digest TEXT, PRIMARY KEY (path, algo))"
+            )
+        except (OSError, sqlite3.Error) as e:
+            print(f"Hash cache disabled: {e}", file=sys.stderr)
+            self._conn = None
+
+    def get(self, entry: os.DirEntry, algo: str) -> Optional[str]:
+        """Return the cached digest for entry, or None on a miss"""
+        if self._conn is None:
+            return None
+        key = _file_key(entry)
+        if key is None:
+            return None
+        row = self._conn.execute(
+            "SELECT digest FROM files WHERE path = ? AND algo = ? "
+            "AND dev = ? AND inode = ? AND size = ? AND mtime_ns = ? AND ctime_ns = ?",
+            (key[0], algo) + key[1:]
+        ).fetchone()
+        # a changed size, mtime or ctime is a miss, so modified files get re-hashed;
+        # ctime catches rewrites that restore the old mtime (cp -p, rsync -t, os.utime)
+        return row[0] if row else None
+
+    def put(self, entry: os.DirEntry, algo: str, digest: str) -> None:
+        """Queue a newly computed digest for entry; written on flush()"""
+        if self._conn is None:
+            return
+        key = _file_key(entry)
+        if key is not None:
+            self._pending.append((key[0], algo) + key[1:] + (digest,))
+
+    def flush(self) -> None:
+        """Write all newly computed digests in a single transaction"""
+        if self._conn is None or not self._pending:
+            return
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO files (path, algo, dev, inode, size, mtime_ns, ctime_ns, digest) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._pending
+                )
+        except sqlite3.Error as e:
+            print(f"Could not update hash cache: {e}", file=sys.stderr)
+        self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "HashCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import sys
+from typing import List, Optional, Tuple
+
+from psamfinder import _hash_cache
+
+# bump whenever compute_phash changes how images are decoded, so stale hashes are dropped
+PHASH_VERSION = 2
+
+
+class PHashCache:
+    """Perceptual hashes persisted in sqlite, keyed by (absolute path, size, mtime_ns)"""
+
+    def __init__(self, enabled: bool = True, db_path: Optional[str] = None) -> None:
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: List[Tuple[str, int, int, str]] = []
+        if not enabled:
+            return
+        try:
+            if db_path is None:
+                db_path = os.path.join(_hash_cache.default_cache_dir(), "phash.sqlite3")
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self._conn = sqlite3.connect(db_path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != PHASH_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS phashes")
+                self._conn.execute(f"PRAGMA user_version = {PHASH_VERSION}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS phashes ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, phash TEXT)"
+            )
+        except (OSError, sqlite3.Error) as e:
+            print(f"pHash cache disabled: {e}", file=sys.stderr)
+            self._conn = None
+
+    def get(self, entry: os.DirEntry) -> Optional[str]:
+        """Return the cached hex pHash for entry, or None on a miss"""
+        if self._conn is None:
+            return None
+        try:
+            st = entry.stat()
+        except OSError:
+            return None # gone or unreadable; let the hashing step report it
+        row = self._conn.execute(
+            "SELECT phash FROM phashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (os.path.abspath(entry.path), st.st_size, st.st_mtime_ns)
+        ).fetchone()
+        # a changed size or mtime is a miss, so edited images get re-hashed
+        return row[0] if row else None
+
+    def put(self, entry: os.DirEntry, value: str) -> None:
+        """Queue a newly computed hex pHash for entry; written on flush()"""
+        if self._conn is None:
+            return
+        try:
+            st = entry.stat()
+        except OSError:
+            return
+        self._pending.append((os.path.abspath(entry.path), st.st_size, st.st_mtime_ns, value))
+
+    def flush(self) -> None:
+        """Write all newly computed hashes in a single transaction"""
+        if self._conn is None or not self._pending:
+            return
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO phashes (path, size, mtime_ns, phash) VALUES (?, ?, ?, ?)",
+                    self._pending
+                )
+        except sqlite3.Error as e:
+            print(f"Could not update pHash cache: {e}", file=sys.stderr)
+        self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "PHashCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
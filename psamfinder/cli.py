@@ -1,3 +1,4 @@
+from enum import Enum
 from pathlib import Path
 from typing import Optional, List
 import typer
@@ -8,14 +9,24 @@ import sys
 __version__ = pkg_version("psamfinder")
 
 from psamfinder.finder import (
+    compute_phashes,
     find_duplicates,
+    iter_duplicate_groups,
+    iter_files,
+    pairwise_hamming,
     print_duplicates,
-    delete_duplicates
+    delete_duplicates,
+    resolve_algo
 )
 
+class HashAlgo(str, Enum):
+    AUTO = "auto"
+    BLAKE3 = "blake3"
+    SHA256 = "sha256"
+
 app = typer.Typer( # pylint: disable=unexpected-keyword-arg
     name="psamfinder",
-    help="Find duplicate files by content (SHA-256)",
+    help="Find duplicate files by content (BLAKE3 or SHA-256)",
     add_completion=True,
     no_args_is_help=True,
     invoke_without_command=True,
@@ -41,7 +52,7 @@ def main(
     )
 ):
     """
-    Find duplicate files by content (SHA-256).
+    Find duplicate files by content (BLAKE3 or SHA-256).
     Use 'scan' to start searching a directory.
     """
     if ctx.invoked_subcommand is None:
@@ -85,23 +96,59 @@ def scan(
         min=0.0,
         max=1.0,
         help="Similarity threshold for fuzzy detection (0.0 to 1.0; try 0.75-0.85 for resized photos)"
+    ),
+    debug: bool = typer.Option(
+        False,
+        "--debug",
+        help="With --fuzzy-images, print the pHash distance of each matched pair"
+    ),
+    algo: HashAlgo = typer.Option(
+        HashAlgo.AUTO,
+        "--algo",
+        case_sensitive=False,
+        help="Hash algorithm for exact matching (auto: sha256 on CPUs with SHA extensions, else blake3)"
+    ),
+    jobs: Optional[int] = typer.Option(
+        None,
+        "--jobs", "-j",
+        min=1,
+        help="Number of files (or images with --fuzzy-images) to hash in parallel (default: number of CPUs)"
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Don't read or write the on-disk hash cache"
     )
 ):
     """Scan directories (and subdirectories) for files with identical content"""
     if not quiet:
         typer.echo(f"Scanning: {directory.resolve()} ...")
     
-    dupe_groups = find_duplicates(
-        str(directory),
-        fuzzy_images=fuzzy_images,
-        similarity_threshold=similarity_threshold
-    )
+    hash_algo = resolve_algo(algo.value)
+    if algo is HashAlgo.AUTO and hash_algo == "blake3" and not fuzzy_images and not quiet:
+        typer.echo("SHA-NI unavailable; using BLAKE3 for ~3× hash throughput", err=True)
     
-    if not dupe_groups:
-        typer.echo("No duplicates found")
-        raise typer.Exit(0)
+    if fuzzy_images or delete:
+        dupe_groups = find_duplicates(
+            str(directory),
+            fuzzy_images=fuzzy_images,
+            similarity_threshold=similarity_threshold,
+            algo=hash_algo,
+            jobs=jobs,
+            use_cache=not no_cache,
+            debug=debug
+        )
+    else:
+        # nothing to delete afterwards, so print each group as soon as it's found
+        dupe_groups = iter_duplicate_groups(
+            str(directory),
+            algo=hash_algo,
+            jobs=jobs,
+            use_cache=not no_cache
+        )
     
-    print_duplicates(dupe_groups)
+    if not print_duplicates(dupe_groups):
+        raise typer.Exit(0)
     
     if delete:
         if not typer.confirm("\n Proceed with deletion"):
@@ -144,6 +191,17 @@ def threshold(
         False,
         "--verbose", "-v",
         help="Show detailed output (all pairs, full distribution)"
+    ),
+    jobs: Optional[int] = typer.Option(
+        None,
+        "--jobs", "-j",
+        min=1,
+        help="Number of images to hash in parallel (default: number of CPUs)"
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Don't read or write the on-disk pHash cache"
     )
 ):
     """Analyze pairwise image similarities to help choose --similarity-threshold"""
@@ -151,22 +209,21 @@ def threshold(
         typer.echo(f"Analyzing images in: {directory.resolve()} ...")
         
     try:
-        from PIL import Image
-        from imagehash import phash
+        import numpy as np
+        import imagehash # pylint: disable=unused-import
     except ImportError as exc:
         raise ImportError("This command requires fuzzy dependencies. Install with: pip install psamfinder[fuzzy]") from exc
     
     image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
-    image_paths: List[str] = []
-    for root, _, files in os.walk(str(directory)):
-        for filename in files:
-            if filename.lower().endswith(image_extensions):
-                image_paths.append(os.path.join(root, filename))
+    image_entries: List[os.DirEntry] = []
+    for entry in iter_files(str(directory)):
+        if entry.name.lower().endswith(image_extensions):
+            image_entries.append(entry)
 
     if max_images > 0:
-        image_paths = image_paths[:max_images]
+        image_entries = image_entries[:max_images]
         
-    n = len(image_paths)
+    n = len(image_entries)
     if n < 2:
         typer.echo("Not enough images to compare (need at least 2).")
         raise typer.Exit(1)
@@ -174,58 +231,67 @@ def threshold(
     typer.echo(f"Processing {n} images...")
     
     # compute hashes
-    hashes = []
+    int_hashes: List[int] = []
     valid_paths = []
-    for path in image_paths:
-        try:
-            img = Image.open(path)
-            h = phash(img)
-            hashes.append(h)
-            valid_paths.append(path)
-        except Exception as e: # pylint: disable=broad-exception-caught
-            print(f"Skipped {path}: {e}", file=sys.stderr)
+    for path, hex_hash, error in compute_phashes(image_entries, use_cache=not no_cache, jobs=jobs):
+        if hex_hash is None:
+            print(f"Skipped {path}: {error}", file=sys.stderr)
+            continue
+        int_hashes.append(int(hex_hash, 16))
+        valid_paths.append(path)
     
-    n = len(hashes)
+    n = len(int_hashes)
     if n < 2:
         typer.echo("Too few valid images after processing")
         raise typer.Exit(1)
     
     # Collect all pairwise distances (upper triangle only)
-    distances = []
-    for i in range(n):
-        for j in range(i + 1, n):
-            dist = hashes[i] - hashes[j]
-            distances.append((dist, valid_paths[i], valid_paths[j]))
+    dist_matrix = pairwise_hamming(int_hashes)
+    pair_i, pair_j = np.triu_indices(n, k=1)
+    pair_dists = dist_matrix[pair_i, pair_j]
     
-    if not distances:
+    if pair_dists.size == 0:
         typer.echo("No pairs to compare")
         raise typer.Exit(0)
 
-    # Sort ascending (smallest distance = most similar first)
-    distances.sort(key=lambda x: x[0])
+    def pairs_at(indices) -> List[tuple]:
+        return [
+            (dist, valid_paths[i], valid_paths[j])
+            for dist, i, j in zip(pair_dists[indices].tolist(), pair_i[indices].tolist(), pair_j[indices].tolist())
+        ]
+
+    # Pick the 10 smallest distances without sorting every pair; ties at the cut-off go to the
+    # earliest pairs, so the result matches a stable full sort
+    top_k = min(10, pair_dists.size)  # limit to 10 for readability
+    kth_dist = np.partition(pair_dists, top_k - 1)[top_k - 1]
+    below = np.flatnonzero(pair_dists < kth_dist)
+    at_cutoff = np.flatnonzero(pair_dists == kth_dist)[:top_k - below.size]
+    top = np.concatenate([below, at_cutoff])
+    top = top[np.lexsort((top, pair_dists[top]))]
     
     # Always show top similar pairs
     typer.echo("\nMost similar pairs:")
-    for dist, p1, p2 in distances[:10]:  # limit to 10 for readability
+    for dist, p1, p2 in pairs_at(top):
         sim = 1 - (dist / 64.0)
         typer.echo(f"  dist {dist:2d} → sim {sim:.3f} | {os.path.basename(p1)} ↔ {os.path.basename(p2)}")
     
     # Always show simple suggestion
-    if distances:
-        non_zero_dists = [d for d, _, _ in distances if d > 0]
-        if non_zero_dists:
-            min_nonzero = min(non_zero_dists)
-            buffer_bits = 3  # tune this: 2=tighter, 4–6=more forgiving
-            suggested_dist = min_nonzero + buffer_bits
-            suggested_sim = 1 - (suggested_dist / 64.0)
-            suggested_sim = max(0.70, min(0.90, round(suggested_sim, 2)))
-        else:
-            suggested_sim = 0.95
+    non_zero_dists = pair_dists[pair_dists > 0]
+    if non_zero_dists.size:
+        min_nonzero = int(non_zero_dists.min())
+        buffer_bits = 3  # tune this: 2=tighter, 4–6=more forgiving
+        suggested_dist = min_nonzero + buffer_bits
+        suggested_sim = 1 - (suggested_dist / 64.0)
+        suggested_sim = max(0.70, min(0.90, round(suggested_sim, 2)))
+    else:
+        suggested_sim = 0.95
 
-        typer.echo(f"\nQuick suggestion: try --similarity-threshold {suggested_sim:.2f} "
-                   f"to catch resized/edited versions like these.")
+    typer.echo(f"\nQuick suggestion: try --similarity-threshold {suggested_sim:.2f} "
+               f"to catch resized/edited versions like these.")
     
     if verbose:
+        # Sort ascending (smallest distance = most similar first)
+        distances = pairs_at(np.argsort(pair_dists, kind="stable"))
         typer.echo("\nAll pairs (sorted by distance):")
         for dist, p1, p2 in distances:
             sim = 1 - (dist / 64.0)
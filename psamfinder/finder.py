@@ -1,137 +1,468 @@
 import os
 import hashlib
+import mmap
+import ssl
 import sys
-from typing import List
+from collections import defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from blake3 import blake3
+
+from psamfinder._hash_cache import HashCache
+from psamfinder._phash_cache import PHashCache
+
+HASH_ALGORITHMS = ("blake3", "sha256")
+# files smaller than this are hashed on the calling thread; handing them to the
+# pool costs more than hashing them
+PARALLEL_THRESHOLD_BYTES = 64 * 1024
+# SHA-256 memory-maps files from this size up; smaller ones are read in one call
+MMAP_THRESHOLD_BYTES = 64 * 1024
+# a size bucket holding exactly two files below this size is byte-compared instead of hashed
+COMPARE_MAX_BYTES = 8 << 20
+# bytes read from the start of each file to split larger size buckets before full hashing
+HEAD_BYTES = 4096
+# fuzzy mode only uses a BK-tree up to this Hamming radius; wider ones use the distance matrix
+BKTREE_MAX_RADIUS = 4
+
+
+# pick a hash algorithm for this machine
+@lru_cache(maxsize=None)
+def has_sha_ni() -> bool:
+    """True if the CPU has SHA extensions that hashlib's OpenSSL backend can use"""
+    if ssl.OPENSSL_VERSION_INFO < (1, 1, 1):
+        return False
+    try:
+        import cpuinfo # optional: py-cpuinfo works on every platform
+        flags = cpuinfo.get_cpu_info().get("flags", [])
+    except ImportError:
+        try:
+            with open("/proc/cpuinfo", encoding="utf-8") as f:
+                flags = f.read().split()
+        except OSError:
+            return False
+    # x86 reports sha_ni (py-cpuinfo: sha), arm64 reports sha2
+    return any(flag in flags for flag in ("sha_ni", "sha", "sha2"))
+
+
+def resolve_algo(algo: str) -> str:
+    """Map 'auto' to sha256 on CPUs with SHA extensions and blake3 elsewhere"""
+    if algo == "auto":
+        return "sha256" if has_sha_ni() else "blake3"
+    return algo
 
 
 # function for computing hash
-def compute_hash(filepath):
-    """Compute SHA-256 hash of file content. Returns None on error"""
-    sha256 = hashlib.sha256()
+def compute_hash(filepath: Union[str, os.PathLike], algo: str = "blake3"):
+    """Compute BLAKE3 (default) or SHA-256 hash of file content (path or DirEntry). Returns None on error"""
     try:
-        with open(filepath, 'rb') as f:
-            while chunk := f.read(4096):
+        if algo == "blake3":
+            # memory-mapped and multi-threaded inside the blake3 extension
+            hasher = blake3(max_threads=blake3.AUTO)
+            hasher.update_mmap(filepath)
+            return hasher.hexdigest()
+        with open(filepath, 'rb', buffering=0) as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < MMAP_THRESHOLD_BYTES:
+                return hashlib.sha256(f.read()).hexdigest()
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mmap, "MADV_SEQUENTIAL"):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    # a single update() over the whole mapping keeps OpenSSL in its SHA-NI/SIMD loop
+                    return hashlib.sha256(mm).hexdigest()
+            except (OSError, ValueError, OverflowError):
+                pass # can't be mapped (special file, or too big for the address space); stream it
+            if sys.version_info >= (3, 11):
+                # read/update loop runs in C with the GIL released
+                return hashlib.file_digest(f, "sha256").hexdigest()
+            sha256 = hashlib.sha256()
+            while chunk := f.read(1 << 20):
                 sha256.update(chunk)
-        return sha256.hexdigest()
+            return sha256.hexdigest()
     except (PermissionError, FileNotFoundError) as e:
-        print(f"Error hashing {filepath}: {e}", file=sys.stderr)
+        print(f"Error hashing {os.fspath(filepath)}: {e}", file=sys.stderr)
         return None # for skipping problematic files
-    
-    
+
+
+# hash the first block of a file
+def _head_digest(filepath: Union[str, os.PathLike], n: int = HEAD_BYTES) -> Optional[bytes]:
+    """SHA-256 of the first n bytes of a file. Returns None on error"""
+    try:
+        with open(filepath, 'rb') as f:
+            return hashlib.sha256(f.read(n)).digest()
+    except OSError as e:
+        print(f"Error hashing {os.fspath(filepath)}: {e}", file=sys.stderr)
+        return None
+
+
+# compare two files byte for byte
+def _files_equal(path_a: Union[str, os.PathLike], path_b: Union[str, os.PathLike]) -> bool:
+    """Return True if two same-sized files have identical content; stops at the first difference"""
+    chunk_size = 1 << 20
+    try:
+        with open(path_a, 'rb') as fa, open(path_b, 'rb') as fb, \
+                mmap.mmap(fa.fileno(), 0, access=mmap.ACCESS_READ) as ma, \
+                mmap.mmap(fb.fileno(), 0, access=mmap.ACCESS_READ) as mb:
+            if len(ma) != len(mb):
+                return False
+            for offset in range(0, len(ma), chunk_size):
+                if ma[offset:offset + chunk_size] != mb[offset:offset + chunk_size]:
+                    return False
+            return True
+    except (OSError, ValueError) as e:
+        print(f"Error comparing {os.fspath(path_a)} and {os.fspath(path_b)}: {e}", file=sys.stderr)
+        return False
+
+
+# walk the directory tree
+def iter_files(directory: str) -> Iterator[os.DirEntry]:
+    """Yield a DirEntry for every regular file under directory (symlinks are not followed)"""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Error scanning {current}: {e}", file=sys.stderr)
+
+
+# function for computing perceptual hash
+def compute_phash(filepath: str) -> str:
+    """Compute the pHash of an image as a hex string. Raises on unreadable images"""
+    from PIL import Image
+    from imagehash import phash
+    with Image.open(filepath) as img:
+        # JPEGs can be decoded at a reduced scale straight into greyscale, far cheaper than a
+        # full decode and still well above pHash's 32x32 working size; no-op for other formats
+        img.draft("L", (64, 64))
+        return str(phash(img.convert("L")))
+
+
+def _phash_one(filepath: str) -> Tuple[Optional[str], Optional[str]]:
+    """Process-pool worker: return (hex pHash, None) or (None, error message)"""
+    try:
+        return compute_phash(filepath), None
+    except Exception as e: # pylint: disable=broad-exception-caught
+        return None, str(e)
+
+
+def compute_phashes(
+    entries: List[os.DirEntry],
+    use_cache: bool = True,
+    jobs: Optional[int] = None
+) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """Return (path, hex pHash, error) for each entry, decoding cache misses on a process pool"""
+    with PHashCache(enabled=use_cache) as cache:
+        cached = [cache.get(entry) for entry in entries]
+        misses = [entry for entry, value in zip(entries, cached) if value is None]
+        computed = {}
+        if misses:
+            # JPEG decode + DCT is CPU-bound, so use processes rather than threads
+            miss_paths = [entry.path for entry in misses]
+            workers = jobs or os.cpu_count() or 1
+            # a handful of images decodes faster inline than a process pool starts up
+            if workers > 1 and len(misses) >= 2 * workers:
+                # about four chunks per worker balances load without per-image IPC
+                chunksize = max(1, len(misses) // (workers * 4))
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(_phash_one, miss_paths, chunksize=chunksize))
+            else:
+                results = [_phash_one(path) for path in miss_paths]
+            for entry, (value, error) in zip(misses, results):
+                computed[entry.path] = (value, error)
+                if value is not None:
+                    cache.put(entry, value)
+    return [
+        (entry.path, value, None) if value is not None else (entry.path, *computed[entry.path])
+        for entry, value in zip(entries, cached)
+    ]
+
+
+# pairwise perceptual-hash distances
+def pairwise_hamming(int_hashes: List[int]):
+    """Return the n x n matrix of Hamming distances between 64-bit hashes packed as ints"""
+    import numpy as np
+
+    packed = np.asarray(int_hashes, dtype=np.uint64)
+    xor = packed[:, None] ^ packed[None, :]
+    if hasattr(np, "bitwise_count"): # numpy 2.0+
+        return np.bitwise_count(xor)
+    n = len(packed)
+    return np.unpackbits(xor.view(np.uint8), axis=-1).reshape(n, n, 64).sum(axis=-1)
+
+
+# Hamming distance between packed hashes (int.bit_count is a single popcount on 3.10+)
+if sys.version_info >= (3, 10):
+    def hamming_distance(a: int, b: int) -> int:
+        return (a ^ b).bit_count()
+else:
+    def hamming_distance(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """BK-tree over packed integer hashes, answering radius queries in Hamming space"""
+
+    def __init__(self) -> None:
+        # each node is (hash, index, {distance: child node})
+        self.root: Optional[tuple] = None
+
+    def add(self, value: int, index: int) -> None:
+        """Insert a hash, remembering the index it was added with"""
+        node = (value, index, {})
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            dist = hamming_distance(value, current[0])
+            child = current[2].get(dist)
+            if child is None:
+                current[2][dist] = node
+                return
+            current = child
+
+    def query(self, value: int, radius: int) -> List[int]:
+        """Return the indices of every stored hash within radius of value"""
+        matches: List[int] = []
+        if self.root is None:
+            return matches
+        stack = [self.root]
+        while stack:
+            node_value, node_index, children = stack.pop()
+            dist = hamming_distance(value, node_value)
+            if dist <= radius:
+                matches.append(node_index)
+            # triangle inequality: only subtrees at distance d-r..d+r can hold matches
+            for child_dist, child in children.items():
+                if dist - radius <= child_dist <= dist + radius:
+                    stack.append(child)
+        return matches
+
+
+# exact duplicates, one size bucket at a time
+class _CompareBucket(NamedTuple):
+    """Two same-sized files settled by a byte compare"""
+    entries: List[os.DirEntry]
+    future: Optional[Future] # _files_equal running on the pool, or None to compare inline
+
+
+class _HashJob(NamedTuple):
+    """One file of a bucket grouped by digest"""
+    entry: os.DirEntry
+    digest: Optional[str] # cache hit; no hashing needed
+    future: Optional[Future] # compute_hash running on the pool; None with no digest means hash inline
+
+
+class _HashBucket(NamedTuple):
+    """Same-sized files grouped by full digest"""
+    jobs: List[_HashJob]
+
+
+def iter_duplicate_groups(
+    directory: str,
+    algo: str = "blake3",
+    jobs: Optional[int] = None,
+    use_cache: bool = True
+) -> Iterator[List[str]]:
+    """Yield groups of files with identical content, hashing one size bucket at a time"""
+    algo = resolve_algo(algo)
+    # group by size first - a file with a unique size can't have a duplicate,
+    # so it never needs to be hashed
+    size_map: defaultdict[int, List[os.DirEntry]] = defaultdict(list) # {size: [entry]}
+    for entry in iter_files(directory):
+        try:
+            size = entry.stat(follow_symlinks=False).st_size
+        except OSError as e:
+            print(f"Error reading {entry.path}: {e}", file=sys.stderr)
+            continue
+        if size > 0: # empty files are trivially identical; skip them
+            size_map[size].append(entry)
+
+    workers = jobs or os.cpu_count() or 1
+    max_in_flight = workers * 4 # bounds how many hashed-but-ungrouped files are held at once
+    in_flight: deque[Union[_CompareBucket, _HashBucket]] = deque()
+    queued = 0
+
+    def drain_bucket(cache: HashCache) -> Iterator[List[str]]:
+        nonlocal queued
+        bucket = in_flight.popleft()
+        if isinstance(bucket, _CompareBucket):
+            queued -= len(bucket.entries)
+            equal = bucket.future.result() if bucket.future else _files_equal(*bucket.entries)
+            if equal:
+                yield [entry.path for entry in bucket.entries]
+            return
+        queued -= len(bucket.jobs)
+        hash_dict: dict[str, list[str]] = {} # {hash: [path]}, for this bucket only
+        for job in bucket.jobs:
+            file_hash = job.digest
+            if file_hash is None:
+                file_hash = job.future.result() if job.future else compute_hash(job.entry, algo)
+                if file_hash:
+                    cache.put(job.entry, algo, file_hash)
+            if file_hash: # only add the file path to the dict if has was successful
+                hash_dict.setdefault(file_hash, []).append(job.entry.path)
+        for group in hash_dict.values():
+            if len(group) > 1:
+                yield group
+
+    with HashCache(enabled=use_cache) as cache, ThreadPoolExecutor(max_workers=workers) as executor:
+        for size, entries in size_map.items():
+            if len(entries) < 2:
+                continue
+            cached = [cache.get(entry, algo) for entry in entries]
+            small_pair = len(entries) == 2 and size < COMPARE_MAX_BYTES # byte-compared below anyway
+            buckets = [list(zip(entries, cached))]
+            if size > HEAD_BYTES and not small_pair and not all(cached):
+                # same-sized files that differ almost always differ in their first block,
+                # so split on that and only fully hash files whose heads collide
+                heads: dict[bytes, list] = {}
+                for entry, digest in buckets[0]:
+                    head = _head_digest(entry)
+                    if head is not None:
+                        heads.setdefault(head, []).append((entry, digest))
+                buckets = [bucket for bucket in heads.values() if len(bucket) > 1]
+
+            # hashlib and blake3 release the GIL, so large files hash in parallel;
+            # small ones are hashed inline when their bucket is drained
+            parallel = workers > 1 and size >= PARALLEL_THRESHOLD_BYTES
+            for bucket in buckets:
+                bucket_entries = [entry for entry, _ in bucket]
+                if len(bucket) == 2 and size < COMPARE_MAX_BYTES and not all(d for _, d in bucket):
+                    # a direct compare stops at the first differing byte and skips hashing
+                    in_flight.append(_CompareBucket(
+                        bucket_entries,
+                        executor.submit(_files_equal, *bucket_entries) if parallel else None
+                    ))
+                else:
+                    in_flight.append(_HashBucket([
+                        _HashJob(
+                            entry, digest,
+                            executor.submit(compute_hash, entry, algo) if parallel and not digest else None
+                        )
+                        for entry, digest in bucket
+                    ]))
+                queued += len(bucket)
+            while queued > max_in_flight:
+                yield from drain_bucket(cache)
+        while in_flight:
+            yield from drain_bucket(cache)
+
 
 # find duplicates
 def find_duplicates(
     directory: str,
     fuzzy_images: bool = False,
-    similarity_threshold: float = 0.80
+    similarity_threshold: float = 0.80,
+    algo: str = "blake3",
+    jobs: Optional[int] = None,
+    use_cache: bool = True,
+    debug: bool = False
 ) -> List[List[str]]:
     """Scan directory recursively and return list of duplicate groups (each a list of file paths)"""
     
     if fuzzy_images:
         try:
-            from PIL import Image
-            from imagehash import phash
+            import numpy as np
+            import imagehash # pylint: disable=unused-import
+            from psamfinder._dsu import dsu_union_pairs
         except ImportError as exc:
             raise ImportError("Fuzzy image detection requires extra dependencies. Install with: pip install psamfinder[fuzzy]") from exc
         
         # collect the image paths
         image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
-        image_paths:List[str] = []
-        for root, _, files in os.walk(directory):
-            for filename in files:
-                if filename.lower().endswith(image_extensions):
-                    image_paths.append(os.path.join(root, filename))
+        image_entries: List[os.DirEntry] = []
+        for entry in iter_files(directory):
+            if entry.name.lower().endswith(image_extensions):
+                image_entries.append(entry)
         
-        if len(image_paths) < 2:
+        if len(image_entries) < 2:
             return []
         
-        # convert perceptual hashes, skipping invalid images
-        hashes = []
+        # convert perceptual hashes (cached across runs), skipping invalid images
+        int_hashes: List[int] = []
         valid_paths = []
-        for path in image_paths:
-            try:
-                img = Image.open(path)
-                h = phash(img)
-                hashes.append(h)
-                valid_paths.append(path)
-            except Exception as e: # pylint: disable=broad-exception-caught
-                print(f"Error processing image {path}: {e}", file=sys.stderr)
+        for path, hex_hash, error in compute_phashes(image_entries, use_cache=use_cache, jobs=jobs):
+            if hex_hash is None:
+                print(f"Error processing image {path}: {error}", file=sys.stderr)
+                continue
+            int_hashes.append(int(hex_hash, 16))
+            valid_paths.append(path)
         
-        n = len(hashes)
+        n = len(int_hashes)
         if n < 2:
             return []
         
         # Convert similarity to max Hamming distance (for 64=bit pHash)
-        hash_size = len(hashes[0].hash.flatten())
+        hash_size = 64
         max_distance = int((1 - similarity_threshold) * hash_size)
         
-        # Union-find helpers
-        parent = list(range(n))
-        def find(i: int) -> int:
-            if parent[i] != i:
-                parent[i] = find(parent[i])
-            return parent[i]
-        def union(i: int, j: int) -> None:
-            pi = find(i)
-            pj = find(j)
-            if pi != pj:
-                parent[pi] = pj
-                
-        for i in range(n):
-            for j in range(i + 1, n):
-                dist = hashes[i] - hashes[j] # Hamming distance
-                if dist <= max_distance:
-                    union(i, j)
+        if max_distance <= BKTREE_MAX_RADIUS:
+            # small radius: a BK-tree prunes most subtrees, so each image meets few neighbours
+            tree = BKTree()
+            for i, h in enumerate(int_hashes):
+                tree.add(h, i)
+            pairs = [
+                (i, j) for i, h in enumerate(int_hashes) for j in tree.query(h, max_distance) if j > i
+            ]
+            pairs_arr = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+        else:
+            # pHash distances cluster around 32, so at wider radii the tree barely prunes
+            # and one vectorized distance matrix is far cheaper
+            pairs_arr = np.argwhere(np.triu(pairwise_hamming(int_hashes) <= max_distance, 1))
+        
+        # union-find over the matching pairs (compiled for large pair counts when numba is installed)
+        roots = dsu_union_pairs(n, pairs_arr[:, 0], pairs_arr[:, 1])
         
         # form groups
-        from collections import defaultdict
         groups: defaultdict[int, List[str]] = defaultdict(list)
-        for i in range(n):
-            root = find(i)
+        for i, root in enumerate(roots.tolist()):
             groups[root].append(valid_paths[i])
         
         dupe_groups = [group for group in groups.values() if len(group) > 1]
-        # Debug: show pairwise distances for small sets (helps user tune threshold)
-        if len(image_paths) <= 20 and dupe_groups:
+        # Debug: show pairwise distances (helps user tune threshold)
+        if debug and dupe_groups:
+            hashes_by_path = dict(zip(valid_paths, int_hashes))
             print("\nDebug: pairwise distances in duplicate groups:")
             for group in dupe_groups:
                 if len(group) == 2:  # only show for pairs (most common during testing)
-                    try:
-                        h1 = phash(Image.open(group[0]))
-                        h2 = phash(Image.open(group[1]))
-                        dist = h1 - h2
-                        sim = 1 - (dist / 64.0)
-                        print(f"  {os.path.basename(group[0])} ↔ {os.path.basename(group[1])} : "
-                              f"dist {dist}, sim {sim:.3f}")
-                    except Exception as e: # pylint: disable=broad-exception-caught
-                        print(f"  Could not compute debug distance for group: {e}")
+                    # reuse the hashes computed above rather than decoding both images again
+                    dist = hamming_distance(hashes_by_path[group[0]], hashes_by_path[group[1]])
+                    sim = 1 - (dist / 64.0)
+                    print(f"  {os.path.basename(group[0])} ↔ {os.path.basename(group[1])} : "
+                          f"dist {dist}, sim {sim:.3f}")
         return dupe_groups
 
     else:
-        hash_dict: dict[str, list[str]] = {} # {hash: [path]}
-        for root, _, files in os.walk(directory):
-            for filename in files:
-                filepath = os.path.join(root, filename)
-                file_hash = compute_hash(filepath)
-                if file_hash: # only add the file path to the dict if has was successful
-                    if file_hash not in hash_dict:
-                        hash_dict[file_hash] = []
-                    hash_dict[file_hash].append(filepath)
-        # filter duplicates with 2+ files
-        dupe_groups = [paths for paths in hash_dict.values() if len(paths) > 1]
-        return dupe_groups
+        return list(iter_duplicate_groups(directory, algo=algo, jobs=jobs, use_cache=use_cache))
 
 # printing duplicates
-def print_duplicates(dupe_groups: List[List[str]]) -> None:
-    if not dupe_groups:
-        print("No duplicates found")
-        return
-    print("Duplicates found")
-    for idx, group in enumerate(dupe_groups, 1):
-        print(f"Group {idx}:")
+def print_duplicates(dupe_groups: Iterable[List[str]]) -> int:
+    """Print each group as it arrives (lists or iter_duplicate_groups); returns the group count"""
+    count = 0
+    for count, group in enumerate(dupe_groups, 1):
+        if count == 1:
+            print("Duplicates found")
+        print(f"Group {count}:")
         for path in group:
             print(f" - {path}")
         print()
+    if not count:
+        print("No duplicates found")
+    return count
 
 def delete_duplicates(dupe_groups: List[List[str]], dry_run: bool = False) -> bool: 
     """Prompt the user to delete duplicates, keeping one per group"""
@@ -0,0 +1,75 @@
+import os
+import time
+
+from psamfinder import _hash_cache, finder
+
+
+class _WindowsLikeEntry:
+    """DirEntry stand-in whose stat() reports st_ino == st_dev == 0, as on Windows"""
+
+    def __init__(self, entry: os.DirEntry) -> None:
+        self._entry = entry
+        self.path = entry.path
+        self.name = entry.name
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        st = self._entry.stat(follow_symlinks=follow_symlinks)
+        fields = list(st)
+        fields[1] = fields[2] = 0 # st_ino, st_dev
+        extra = {name: getattr(st, name) for name in ("st_atime_ns", "st_mtime_ns", "st_ctime_ns")}
+        return os.stat_result(fields, extra)
+
+    def inode(self) -> int:
+        return 0
+
+    def __fspath__(self) -> str:
+        return self.path
+
+
+def test_cache_keeps_same_size_same_mtime_files_apart(tmp_path, monkeypatch):
+    scan_dir = tmp_path / "scan"
+    scan_dir.mkdir()
+    contents = {"a": b"A" * 5000, "b": b"B" * 5000, "c": b"C" * 5000}
+    for name, count in (("a", 3), ("b", 3), ("c", 1)):
+        for i in range(count):
+            (scan_dir / f"{name}{i}").write_bytes(contents[name])
+    for path in scan_dir.iterdir():
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+    monkeypatch.setattr(_hash_cache, "default_cache_dir", lambda: str(tmp_path / "cache"))
+    real_iter_files = finder.iter_files
+    monkeypatch.setattr(
+        finder, "iter_files",
+        lambda directory: (_WindowsLikeEntry(entry) for entry in real_iter_files(directory))
+    )
+
+    expected = sorted(
+        sorted(os.path.join(str(scan_dir), f"{name}{i}") for i in range(3)) for name in ("a", "b")
+    )
+    for _ in range(2): # second run is answered from the cache
+        groups = finder.find_duplicates(str(scan_dir), algo="sha256", jobs=1)
+        assert sorted(sorted(group) for group in groups) == expected
+
+
+def test_cache_misses_rewrite_with_restored_mtime(tmp_path, monkeypatch):
+    scan_dir = tmp_path / "scan"
+    scan_dir.mkdir()
+    for i in range(3):
+        (scan_dir / f"a{i}").write_bytes(b"A" * 5000)
+    monkeypatch.setattr(_hash_cache, "default_cache_dir", lambda: str(tmp_path / "cache"))
+
+    groups = finder.find_duplicates(str(scan_dir), algo="sha256", jobs=1)
+    assert [sorted(group) for group in groups] == [sorted(str(p) for p in scan_dir.iterdir())]
+
+    # same size, old mtime put back; only ctime tells the cache the contents changed
+    target = scan_dir / "a0"
+    st = target.stat()
+    while target.stat().st_ctime_ns == st.st_ctime_ns:
+        time.sleep(0.01)
+        target.write_bytes(b"Z" * 5000)
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    groups = finder.find_duplicates(str(scan_dir), algo="sha256", jobs=1)
+    assert [sorted(group) for group in groups] == [
+        sorted(str(scan_dir / f"a{i}") for i in (1, 2))
+    ]
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+from psamfinder import _hash_cache, finder
+
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("imagehash")
+
+
+def test_image_removed_after_scan_is_reported_not_raised(tmp_path, monkeypatch):
+    monkeypatch.setattr(_hash_cache, "default_cache_dir", lambda: str(tmp_path / "cache"))
+    for i in range(3):
+        Image.new("L", (64, 64), i * 80).save(tmp_path / f"img{i}.png")
+    entries = sorted(finder.iter_files(str(tmp_path)), key=lambda entry: entry.name)
+    os.remove(entries[1].path)
+
+    results = finder.compute_phashes(entries, use_cache=True, jobs=1)
+
+    assert [path for path, value, _ in results if value is None] == [entries[1].path]
+    assert results[1][2]